@@ -4,11 +4,79 @@ Handles admin user management and validation.
 """
 import os
 import logging
-from typing import Union
+import threading
+from typing import FrozenSet, Union
 from config import Config
+from utils import write_file_atomic
 
 logger = logging.getLogger(__name__)
 
+# Parsed admins file, reloaded only when its mtime changes
+_admins_cache: FrozenSet[str] = frozenset()
+_admins_mtime: int = -1
+# Whether the cached file is in an older format that can't simply be appended to
+_admins_needs_rewrite: bool = False
+_admins_lock = threading.RLock()
+
+
+def _get_admins_set() -> FrozenSet[str]:
+    """
+    Get the set of admins, re-reading the admins file only if it changed.
+    
+    Returns:
+        Frozen set of admin IDs and usernames
+    """
+    global _admins_cache, _admins_mtime, _admins_needs_rewrite
+    
+    try:
+        mtime = os.stat(Config.ADMINS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        logger.warning("Admins file not found: %s", Config.ADMINS_FILE)
+        return frozenset()
+    
+    if mtime == _admins_mtime:
+        return _admins_cache
+    
+    with _admins_lock:
+        if mtime != _admins_mtime:
+            with open(Config.ADMINS_FILE, 'r', encoding='utf-8') as file:
+                content = file.read()
+            # Admins are stored one per line; older files were comma-separated.
+            # The file is only normalized by the next write, so a read-only
+            # admins file keeps working.
+            _admins_cache = frozenset(content.replace(',', '\n').split())
+            _admins_mtime = mtime
+            _admins_needs_rewrite = ',' in content or not content.endswith('\n')
+        return _admins_cache
+
+
+def _format_admins(admins: FrozenSet[str]) -> str:
+    """
+    Format admins for the admins file, one per line.
+    
+    Args:
+        admins: Admin IDs and usernames
+        
+    Returns:
+        File contents
+    """
+    return ''.join(f"{admin}\n" for admin in sorted(admins))
+
+
+def _update_admins_cache(admins: FrozenSet[str]):
+    """
+    Store a freshly written admins set without re-reading the file.
+    
+    Must be called with _admins_lock held, right after writing the file.
+    
+    Args:
+        admins: Admin set that now matches the file contents
+    """
+    global _admins_cache, _admins_mtime, _admins_needs_rewrite
+    _admins_cache = admins
+    _admins_mtime = os.stat(Config.ADMINS_FILE).st_mtime_ns
+    _admins_needs_rewrite = False
+
 
 def is_admin_user(user_id: Union[int, str]) -> bool:
     """
@@ -21,20 +89,27 @@ def is_admin_user(user_id: Union[int, str]) -> bool:
         True if user is admin, False otherwise
     """
     try:
-        if not os.path.exists(Config.ADMINS_FILE):
-            logger.warning(f"Admins file not found: {Config.ADMINS_FILE}")
-            return False
+        return str(user_id) in _get_admins_set()
+    except Exception as e:
+        logger.error("Error checking admin status: %s", e)
+        return False
+
+
+def is_admin_any(*identities: Union[int, str, None]) -> bool:
+    """
+    Check if any of the given identities (e.g. chat ID and username) is an admin.
+    
+    Args:
+        identities: User IDs or usernames to check; None values are ignored
         
-        with open(Config.ADMINS_FILE, 'r', encoding='utf-8') as file:
-            content = file.read().strip()
-            if not content:
-                return False
-            
-            # Split by comma and check if user_id is in the list
-            admins = [admin.strip() for admin in content.split(',') if admin.strip()]
-            return str(user_id) in admins
+    Returns:
+        True if any identity is admin, False otherwise
+    """
+    try:
+        admins = _get_admins_set()
+        return any(str(identity) in admins for identity in identities if identity is not None)
     except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
+        logger.error("Error checking admin status: %s", e)
         return False
 
 
@@ -54,24 +129,28 @@ def add_admin_to_file(new_admin: str) -> bool:
             logger.warning("Empty admin ID provided")
             return False
         
-        # Check if already admin
-        if is_admin_user(new_admin):
-            logger.info(f"User {new_admin} is already an admin")
-            return True
-        
-        # Create file if it doesn't exist
-        file_exists = os.path.exists(Config.ADMINS_FILE)
-        
-        with open(Config.ADMINS_FILE, 'a', encoding='utf-8') as file:
-            if file_exists:
-                file.write(f",{new_admin}")
+        # Read, check and append under one lock so concurrent calls see each other's writes
+        with _admins_lock:
+            admins = _get_admins_set()
+            if new_admin in admins:
+                logger.info("User %s is already an admin", new_admin)
+                return True
+            
+            admins = admins | {new_admin}
+            if _admins_needs_rewrite and len(admins) > 1:
+                # Convert an older file to one admin per line instead of appending to it
+                write_file_atomic(Config.ADMINS_FILE, _format_admins(admins))
+                logger.info("Rewrote %s with one admin per line", Config.ADMINS_FILE)
             else:
-                file.write(new_admin)
+                # Creates the file if it doesn't exist
+                with open(Config.ADMINS_FILE, 'a', encoding='utf-8') as file:
+                    file.write(f"{new_admin}\n")
+            _update_admins_cache(admins)
         
-        logger.info(f"Admin {new_admin} added successfully")
+        logger.info("Admin %s added successfully", new_admin)
         return True
     except Exception as e:
-        logger.error(f"Error adding admin: {e}")
+        logger.error("Error adding admin: %s", e)
         return False
 
 
@@ -86,25 +165,18 @@ def remove_admin(admin_id: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        if not os.path.exists(Config.ADMINS_FILE):
-            return False
-        
-        with open(Config.ADMINS_FILE, 'r', encoding='utf-8') as file:
-            content = file.read().strip()
-            if not content:
+        admin_id = str(admin_id)
+        with _admins_lock:
+            admins = _get_admins_set()
+            if admin_id not in admins:
                 return False
             
-            admins = [admin.strip() for admin in content.split(',') if admin.strip()]
-            if str(admin_id) not in admins:
-                return False
-            
-            admins.remove(str(admin_id))
-        
-        with open(Config.ADMINS_FILE, 'w', encoding='utf-8') as file:
-            file.write(','.join(admins))
+            admins = admins - {admin_id}
+            write_file_atomic(Config.ADMINS_FILE, _format_admins(admins))
+            _update_admins_cache(admins)
         
-        logger.info(f"Admin {admin_id} removed successfully")
+        logger.info("Admin %s removed successfully", admin_id)
         return True
     except Exception as e:
-        logger.error(f"Error removing admin: {e}")
+        logger.error("Error removing admin: %s", e)
         return False
@@ -2,41 +2,85 @@
 Main bot module for SSH Telegram Bot.
 Handles all Telegram bot commands and interactions.
 """
+import asyncio
 import os
-from time import gmtime, strftime
+import threading
 from typing import Optional, List
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 import logging
 
-from authentication import is_admin_user, add_admin_to_file
+from authentication import is_admin_user, is_admin_any, add_admin_to_file
 from servers import (
-    get_servers_data, is_valid_ip, is_valid_login, add_server, del_server,
-    connect_to_server, disconnect_from_server, do_command, is_connected_to_server,
-    get_connected_server_info
+    get_servers_data, get_server_by_index, is_valid_ip, is_valid_login_async, add_server, del_server,
+    connect_to_server_async, disconnect_from_server_async, do_command_async, is_connected_to_server,
+    get_connected_server_info, reap_idle_sessions
+)
+from utils import (
+    get_user_info, validate_command, sanitize_input, format_server_list, write_file_atomic,
+    utc_timestamp
 )
-from utils import get_user_info, validate_command, sanitize_input, format_server_list
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Parsed default commands file, reloaded only when its mtime changes
+_cmds_cache: List[str] = []
+_cmds_mtime: int = -1
+# Whether the file's last line lacks a newline, so an append must add one first
+_cmds_missing_newline: bool = False
+_cmds_lock = threading.RLock()
+
+# Static replies, built once at import
+_START_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Add Server", callback_data="add_server")],
+    [InlineKeyboardButton("Delete Server", callback_data="del_server")],
+    [InlineKeyboardButton("List Servers", callback_data="list_servers")],
+    [InlineKeyboardButton("Connect to Server", callback_data="connect_server")],
+    [InlineKeyboardButton("Disconnect from Server", callback_data="disconnect_server")],
+    [InlineKeyboardButton("Default Commands", callback_data="default_commands")],
+    [InlineKeyboardButton("Help", callback_data="help")]
+])
+
+_CMDS_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Add Command", callback_data="add_command")],
+    [InlineKeyboardButton("Remove Command", callback_data="remove_command")]
+])
+
+_HELP_TEXT = (
+    "Please check the repository for command guides:\n"
+    "https://github.com/ItsOrv/SSH-TelegramBot\n\n"
+    "Available commands:\n"
+    "/start - Show main menu\n"
+    "/help - Show this help message\n"
+    "/add_admin [ID] - Add an admin (admin only)\n"
+    "/add_server [IP] [Username] [Password] - Add a server (admin only)\n"
+    "/del_server [Number] - Delete a server (admin only)\n"
+    "/servers_list - List all servers (admin only)\n"
+    "/connect [Number] - Connect to a server (admin only)\n"
+    "/disconnect - Disconnect from server (admin only)\n"
+    "/add_command [Command] - Add a default command\n"
+    "/remove_command [Number] - Remove a default command"
+)
+
+# Chat types in which commands are not executed
+_GROUP_CHAT_TYPES = frozenset({'group', 'supergroup'})
+
+# Inline buttons that only reply with a usage hint
+_CALLBACK_MESSAGES = {
+    "add_server": "To add a server, use the command: /add_server [IP] [Username] [Password]",
+    "del_server": "To delete a server, use the command: /del_server [Server Number]",
+    "connect_server": "To connect to a server, use the command: /connect [Server Number]",
+    "add_command": "To add a command, use the command: /add_command [Your Command]",
+    "remove_command": "To remove a command, use the command: /remove_command [Command Number]",
+}
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command with inline keyboard."""
-    keyboard = [
-        [InlineKeyboardButton("Add Server", callback_data="add_server")],
-        [InlineKeyboardButton("Delete Server", callback_data="del_server")],
-        [InlineKeyboardButton("List Servers", callback_data="list_servers")],
-        [InlineKeyboardButton("Connect to Server", callback_data="connect_server")],
-        [InlineKeyboardButton("Disconnect from Server", callback_data="disconnect_server")],
-        [InlineKeyboardButton("Default Commands", callback_data="default_commands")],
-        [InlineKeyboardButton("Help", callback_data="help")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await update.message.reply_text(
         'Welcome to **SSH Terminal Bot**\nChoose an action:',
-        reply_markup=reply_markup,
+        reply_markup=_START_KEYBOARD,
         parse_mode="Markdown"
     )
 
@@ -46,54 +90,19 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    if query.data == "add_server":
-        await query.message.reply_text(
-            "To add a server, use the command: /add_server [IP] [Username] [Password]"
-        )
-    elif query.data == "del_server":
-        await query.message.reply_text(
-            "To delete a server, use the command: /del_server [Server Number]"
-        )
-    elif query.data == "list_servers":
-        await servers_list(update, context)
-    elif query.data == "connect_server":
-        await query.message.reply_text(
-            "To connect to a server, use the command: /connect [Server Number]"
-        )
-    elif query.data == "disconnect_server":
-        await disconnect_from_server_handler(update, context)
-    elif query.data == "default_commands":
-        await show_default_commands(update, context)
-    elif query.data == "help":
-        await help_command(update, context)
-    elif query.data == "add_command":
-        await query.message.reply_text(
-            "To add a command, use the command: /add_command [Your Command]"
-        )
-    elif query.data == "remove_command":
-        await query.message.reply_text(
-            "To remove a command, use the command: /remove_command [Command Number]"
-        )
+    message = _CALLBACK_MESSAGES.get(query.data)
+    if message:
+        await query.message.reply_text(message)
+        return
+    
+    handler = _CALLBACK_HANDLERS.get(query.data)
+    if handler:
+        await handler(update, context)
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /help command."""
-    help_text = (
-        "Please check the repository for command guides:\n"
-        "https://github.com/ItsOrv/SSH-TelegramBot\n\n"
-        "Available commands:\n"
-        "/start - Show main menu\n"
-        "/help - Show this help message\n"
-        "/add_admin [ID] - Add an admin (admin only)\n"
-        "/add_server [IP] [Username] [Password] - Add a server (admin only)\n"
-        "/del_server [Number] - Delete a server (admin only)\n"
-        "/servers_list - List all servers (admin only)\n"
-        "/connect [Number] - Connect to a server (admin only)\n"
-        "/disconnect - Disconnect from server (admin only)\n"
-        "/add_command [Command] - Add a default command\n"
-        "/remove_command [Number] - Remove a default command"
-    )
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=help_text)
+    await context.bot.send_message(chat_id=update.effective_chat.id, text=_HELP_TEXT)
 
 
 async def add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -110,8 +119,7 @@ async def add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message:
         return
     
-    data = update.message.text
-    processed_data = data.replace("/add_admin", '').strip()
+    processed_data = context.args[0] if context.args else ''
     
     if not processed_data:
         await context.bot.send_message(
@@ -120,8 +128,8 @@ async def add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    if add_admin_to_file(processed_data):
-        logger.info(f"New admin added by ({username} {user_chat_id}): {processed_data}")
+    if await asyncio.to_thread(add_admin_to_file, processed_data):
+        logger.info("New admin added by (%s %s): %s", username, user_chat_id, processed_data)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text=f"New admin added: {processed_data} is now admin."
@@ -137,7 +145,7 @@ async def del_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Handle /del_server command."""
     user_chat_id, username = get_user_info(update)
 
-    if not (is_admin_user(user_chat_id) or is_admin_user(username)):
+    if not is_admin_any(user_chat_id, username):
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="You need admin access to delete a server!"
@@ -148,8 +156,7 @@ async def del_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     try:
-        data = update.message.text
-        processed_data = data.replace("/del_server", '').strip()
+        processed_data = context.args[0] if context.args else ''
         
         if not processed_data or not processed_data.isdigit():
             await context.bot.send_message(
@@ -159,20 +166,19 @@ async def del_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return
         
         server_number = int(processed_data)
-        servers = get_servers_data()
+        server_info = await asyncio.to_thread(get_server_by_index, server_number - 1)
         
-        if server_number < 1 or server_number > len(servers):
+        if server_info is None:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
                 text="Server doesn't exist. Please try again."
             )
             return
         
-        server_info = servers[server_number - 1]
-        if del_server(server_number):
+        if await asyncio.to_thread(del_server, server_number):
             logger.info(
-                f"Server deleted by ({username} {user_chat_id}): "
-                f"IP={server_info[0]}, User={server_info[1]}"
+                "Server deleted by (%s %s): IP=%s, User=%s",
+                username, user_chat_id, server_info[0], server_info[1]
             )
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
@@ -180,7 +186,7 @@ async def del_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
                     f'Server Deleted\n'
                     f'Server IP: {server_info[0]}\n'
                     f'Connection Info: {server_info[1]}:{server_info[2]}\n'
-                    f'Deleted by: {user_chat_id} at {strftime("%Y-%m-%d %H:%M:%S", gmtime())}'
+                    f'Deleted by: {user_chat_id} at {utc_timestamp()}'
                 )
             )
         else:
@@ -189,7 +195,7 @@ async def del_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 text="Failed to delete server. Please try again."
             )
     except Exception as e:
-        logger.error(f"Error in del_server_handler: {e}")
+        logger.error("Error in del_server_handler: %s", e)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="An error occurred while deleting the server."
@@ -200,7 +206,7 @@ async def add_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Handle /add_server command."""
     user_chat_id, username = get_user_info(update)
     
-    if not (is_admin_user(user_chat_id) or is_admin_user(username)):
+    if not is_admin_any(user_chat_id, username):
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="You need admin access to add a new server!"
@@ -211,9 +217,7 @@ async def add_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     try:
-        data = update.message.text
-        processed_data = data.replace("/add_server", '').strip()
-        processed_data_list = processed_data.split()
+        processed_data_list = context.args or []
         
         if len(processed_data_list) < 3:
             await context.bot.send_message(
@@ -243,7 +247,7 @@ async def add_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
             text="IP validation successful. Checking login information..."
         )
         
-        if not is_valid_login(server_ip, server_username, server_password):
+        if not await is_valid_login_async(server_ip, server_username, server_password):
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
                 text="Adding new server failed! Either username or password is incorrect. Please try again."
@@ -255,10 +259,12 @@ async def add_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
             text="Login information validation successful. Adding server..."
         )
         
-        timestamp = strftime("%Y-%m-%d %H:%M:%S", gmtime())
-        if add_server(server_ip, server_username, server_password, str(user_chat_id), timestamp):
+        timestamp = utc_timestamp()
+        if await asyncio.to_thread(
+            add_server, server_ip, server_username, server_password, str(user_chat_id), timestamp
+        ):
             logger.info(
-                f"New server added by ({username} {user_chat_id}): {server_ip}"
+                "New server added by (%s %s): %s", username, user_chat_id, server_ip
             )
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
@@ -275,7 +281,7 @@ async def add_server_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 text="Failed to add server. Please try again."
             )
     except Exception as e:
-        logger.error(f"Error in add_server_handler: {e}")
+        logger.error("Error in add_server_handler: %s", e)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="An error occurred while adding the server."
@@ -286,15 +292,15 @@ async def servers_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /servers_list command."""
     user_chat_id, username = get_user_info(update)
     
-    if not (is_admin_user(user_chat_id) or is_admin_user(username)):
+    if not is_admin_any(user_chat_id, username):
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="You need admin access to view list of servers!"
         )
         return
     
-    logger.info(f"List of servers asked by: ({username} {user_chat_id})")
-    servers = get_servers_data()
+    logger.info("List of servers asked by: (%s %s)", username, user_chat_id)
+    servers = await asyncio.to_thread(get_servers_data)
     table = format_server_list(servers)
     await context.bot.send_message(chat_id=update.effective_chat.id, text=table)
 
@@ -303,14 +309,14 @@ async def connect_to_server_handler(update: Update, context: ContextTypes.DEFAUL
     """Handle /connect command."""
     user_chat_id, username = get_user_info(update)
     
-    if not (is_admin_user(user_chat_id) or is_admin_user(username)):
+    if not is_admin_any(user_chat_id, username):
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="You need admin access to connect to a server!"
         )
         return
     
-    if is_connected_to_server():
+    if is_connected_to_server(update.effective_chat.id):
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="Already connected to server. Please disconnect first using: /disconnect"
@@ -321,8 +327,7 @@ async def connect_to_server_handler(update: Update, context: ContextTypes.DEFAUL
         return
     
     try:
-        data = update.message.text
-        processed_data = data.replace("/connect", '').strip()
+        processed_data = context.args[0] if context.args else ''
         
         if not processed_data or not processed_data.isdigit():
             await context.bot.send_message(
@@ -332,23 +337,22 @@ async def connect_to_server_handler(update: Update, context: ContextTypes.DEFAUL
             return
         
         server_index = int(processed_data) - 1
-        servers = get_servers_data()
+        server_info = await asyncio.to_thread(get_server_by_index, server_index)
         
-        if server_index < 0 or server_index >= len(servers):
+        if server_info is None:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
                 text="Invalid server number. Please try again."
             )
             return
         
-        server_info = servers[server_index]
         server_ip = server_info[0]
         server_username = server_info[1]
         server_password = server_info[2]
         
         logger.info(
-            f"Trying to connect to server by ({username} {user_chat_id}): "
-            f"IP={server_ip}, User={server_username}"
+            "Trying to connect to server by (%s %s): IP=%s, User=%s",
+            username, user_chat_id, server_ip, server_username
         )
         
         await context.bot.send_message(
@@ -361,7 +365,9 @@ async def connect_to_server_handler(update: Update, context: ContextTypes.DEFAUL
             )
         )
         
-        success, error_msg = connect_to_server(server_ip, server_username, server_password)
+        success, error_msg = await connect_to_server_async(
+            update.effective_chat.id, server_ip, server_username, server_password
+        )
         
         if success:
             await context.bot.send_message(
@@ -374,7 +380,7 @@ async def connect_to_server_handler(update: Update, context: ContextTypes.DEFAUL
                 text=f"Couldn't connect to server! {error_msg or 'Unknown error'}"
             )
     except Exception as e:
-        logger.error(f"Error in connect_to_server_handler: {e}")
+        logger.error("Error in connect_to_server_handler: %s", e)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="An error occurred while connecting to the server."
@@ -385,16 +391,16 @@ async def disconnect_from_server_handler(update: Update, context: ContextTypes.D
     """Handle /disconnect command."""
     user_chat_id, username = get_user_info(update)
 
-    if not (is_admin_user(user_chat_id) or is_admin_user(username)):
+    if not is_admin_any(user_chat_id, username):
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="You need admin access to disconnect from a server!"
         )
         return
     
-    logger.info(f"Trying to close connection by ({username} {user_chat_id})")
+    logger.info("Trying to close connection by (%s %s)", username, user_chat_id)
     
-    if disconnect_from_server():
+    if await disconnect_from_server_async(update.effective_chat.id):
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="Connection closed!"
@@ -406,21 +412,96 @@ async def disconnect_from_server_handler(update: Update, context: ContextTypes.D
         )
 
 
+def _load_commands() -> List[str]:
+    """
+    Get the cached commands list, re-reading the file only if it changed.
+    
+    Unlike get_default_commands, read errors other than a missing file are
+    raised, so writers never rewrite the file from a failed read. The
+    returned list is shared with the cache and must not be mutated.
+    
+    Returns:
+        List of commands
+    """
+    global _cmds_cache, _cmds_mtime, _cmds_missing_newline
+    with _cmds_lock:
+        try:
+            mtime = os.stat(Config.COMMANDS_FILE).st_mtime_ns
+        except FileNotFoundError:
+            _cmds_missing_newline = False
+            return []
+        if mtime != _cmds_mtime:
+            with open(Config.COMMANDS_FILE, 'r', encoding='utf-8') as file:
+                content = file.read()
+            _cmds_cache = list(filter(None, map(str.strip, content.splitlines())))
+            _cmds_missing_newline = bool(content) and not content.endswith('\n')
+            _cmds_mtime = mtime
+        return _cmds_cache
+
+
 def get_default_commands() -> List[str]:
     """Get list of default commands from file."""
-    commands = []
     try:
-        if os.path.exists(Config.COMMANDS_FILE):
-            with open(Config.COMMANDS_FILE, 'r', encoding='utf-8') as file:
-                commands = [line.strip() for line in file.readlines() if line.strip()]
+        # Callers may mutate the result, so hand out a copy
+        return list(_load_commands())
     except Exception as e:
-        logger.error(f"Error reading commands file: {e}")
-    return commands
+        logger.error("Error reading commands file: %s", e)
+    return []
+
+
+def _update_commands_cache(commands: List[str]):
+    """
+    Store a freshly written commands list without re-reading the file.
+    
+    Must be called with _cmds_lock held, right after writing the file.
+    
+    Args:
+        commands: Command list that now matches the file contents
+    """
+    global _cmds_cache, _cmds_mtime, _cmds_missing_newline
+    _cmds_cache = commands
+    _cmds_mtime = os.stat(Config.COMMANDS_FILE).st_mtime_ns
+    _cmds_missing_newline = False
+
+
+def _append_command(command_text: str):
+    """
+    Append a command to the commands file.
+    
+    Args:
+        command_text: Command to append
+    """
+    with _cmds_lock:
+        commands = _load_commands()
+        with open(Config.COMMANDS_FILE, 'a', encoding='utf-8') as file:
+            # Don't glue the new command onto an unterminated last line
+            file.write(f"\n{command_text}\n" if _cmds_missing_newline else f"{command_text}\n")
+        _update_commands_cache(commands + [command_text])
+
+
+def _remove_command(index: int) -> Optional[str]:
+    """
+    Remove a command from the commands file.
+    
+    Args:
+        index: 0-based command index
+        
+    Returns:
+        The removed command, or None if there is no such command
+    """
+    with _cmds_lock:
+        commands = list(_load_commands())
+        if not 0 <= index < len(commands):
+            return None
+        removed_command = commands.pop(index)
+        write_file_atomic(Config.COMMANDS_FILE, ''.join(f"{command}\n" for command in commands))
+        _update_commands_cache(commands)
+        return removed_command
 
 
 async def show_default_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show default commands with inline keyboard."""
-    commands = get_default_commands()
+    commands = await asyncio.to_thread(get_default_commands)
     
     if commands:
         message = "Default Commands:\n\n"
@@ -429,16 +510,10 @@ async def show_default_commands(update: Update, context: ContextTypes.DEFAULT_TY
     else:
         message = "No commands found."
 
-    keyboard = [
-        [InlineKeyboardButton("Add Command", callback_data="add_command")],
-        [InlineKeyboardButton("Remove Command", callback_data="remove_command")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     if update.callback_query:
-        await update.callback_query.message.reply_text(message, reply_markup=reply_markup, parse_mode="Markdown")
+        await update.callback_query.message.reply_text(message, reply_markup=_CMDS_KEYBOARD, parse_mode="Markdown")
     elif update.message:
-        await update.message.reply_text(message, reply_markup=reply_markup, parse_mode="Markdown")
+        await update.message.reply_text(message, reply_markup=_CMDS_KEYBOARD, parse_mode="Markdown")
 
 
 async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -446,7 +521,9 @@ async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message:
         return
     
-    command_text = update.message.text.replace("/add_command", "").strip()
+    # Keep the command's original spacing instead of re-joining context.args
+    parts = update.message.text.split(None, 1)
+    command_text = parts[1].strip() if len(parts) > 1 else ''
     
     if not command_text:
         await context.bot.send_message(
@@ -468,17 +545,16 @@ async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Sanitize command
         command_text = sanitize_input(command_text)
         
-        with open(Config.COMMANDS_FILE, 'a', encoding='utf-8') as file:
-            file.write(f"{command_text}\n")
+        await asyncio.to_thread(_append_command, command_text)
         
-        logger.info(f"Command added: {command_text}")
+        logger.info("Command added: %s", command_text)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text=f"Command added: `{command_text}`",
             parse_mode="Markdown"
         )
     except Exception as e:
-        logger.error(f"Error adding command: {e}")
+        logger.error("Error adding command: %s", e)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="Failed to add command. Please try again."
@@ -491,7 +567,7 @@ async def remove_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     try:
-        command_text = update.message.text.replace("/remove_command", "").strip()
+        command_text = context.args[0] if context.args else ''
         
         if not command_text or not command_text.isdigit():
             await context.bot.send_message(
@@ -500,52 +576,49 @@ async def remove_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
         
-        command_index = int(command_text) - 1
-        commands = get_default_commands()
+        try:
+            command_index = int(command_text) - 1
+        except ValueError:
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="Please provide a valid command number."
+            )
+            return
+        removed_command = await asyncio.to_thread(_remove_command, command_index)
         
-        if command_index < 0 or command_index >= len(commands):
+        if removed_command is None:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
                 text="Invalid command number."
             )
             return
         
-        removed_command = commands.pop(command_index)
-        
-        with open(Config.COMMANDS_FILE, 'w', encoding='utf-8') as file:
-            for command in commands:
-                file.write(f"{command}\n")
-        
-        logger.info(f"Command removed: {removed_command}")
+        logger.info("Command removed: %s", removed_command)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text=f"Command removed: `{removed_command}`",
             parse_mode="Markdown"
         )
-    except ValueError:
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="Please provide a valid command number."
-        )
     except Exception as e:
-        logger.error(f"Error removing command: {e}")
+        logger.error("Error removing command: %s", e)
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="Failed to remove command. Please try again."
         )
 
 
-def handle_command(text: str) -> str:
+async def handle_command(chat_id: int, text: str) -> str:
     """
-    Handle command execution on connected server.
+    Handle command execution on the server a chat is connected to.
     
     Args:
+        chat_id: Telegram chat ID
         text: Command text to execute
         
     Returns:
         Formatted response string
     """
-    if not is_connected_to_server():
+    if not is_connected_to_server(chat_id):
         return "I'm not connected to any server.\nPlease connect me with /connect command"
     
     # Sanitize and validate command
@@ -556,16 +629,16 @@ def handle_command(text: str) -> str:
         return f"Command rejected: {error_msg}"
     
     try:
-        stdout, stderr = do_command(sanitized_text, timeout=Config.SSH_TIMEOUT)
+        stdout, stderr = await do_command_async(chat_id, sanitized_text, timeout=Config.SSH_TIMEOUT)
         
-        response = f"*Done!*\n```shell\n{sanitized_text}\n```\n\n*Output:*\n```\n{stdout}\n```"
+        parts = ["*Done!*\n```shell\n", sanitized_text, "\n```\n\n*Output:*\n```\n", stdout, "\n```"]
         
         if stderr:
-            response += f"\n\n*Errors:*\n```\n{stderr}\n```"
+            parts += ["\n\n*Errors:*\n```\n", stderr, "\n```"]
         
-        return response
+        return "".join(parts)
     except Exception as e:
-        logger.error(f"Error executing command: {e}")
+        logger.error("Error executing command: %s", e)
         return f"Command execution failed: {str(e)}"
 
 
@@ -574,25 +647,25 @@ async def command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message:
         return
     
-    message_type = update.message.chat.type
     text = update.message.text
     
     if not text:
         return
     
-    logger.info(
-        f'User ({update.message.chat.first_name} {update.message.chat.last_name}) '
-        f'in {message_type}: "{text}"'
-    )
-    
-    if message_type in ('group', 'supergroup'):
+    message_type = update.message.chat.type
+    if message_type in _GROUP_CHAT_TYPES:
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="Currently I'm not able to execute commands given in groups!"
         )
         return
     
-    response = handle_command(text)
+    logger.info(
+        'User (%s %s) in %s: "%s"',
+        update.message.chat.first_name, update.message.chat.last_name, message_type, text
+    )
+    
+    response = await handle_command(update.effective_chat.id, text)
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
         text=response,
@@ -600,9 +673,16 @@ async def command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+async def reap_idle_sessions_job(context: ContextTypes.DEFAULT_TYPE):
+    """Close SSH sessions left idle for longer than Config.IDLE_TIMEOUT."""
+    closed = await asyncio.to_thread(reap_idle_sessions)
+    if closed:
+        logger.info("Closed %d idle SSH session(s)", closed)
+
+
 async def error_handler(update: Optional[Update], context: ContextTypes.DEFAULT_TYPE):
     """Handle errors in the bot."""
-    logger.error(f"Update {update} caused error {context.error}")
+    logger.error("Update %s caused error %s", update, context.error)
     if update and update.effective_chat:
         try:
             await context.bot.send_message(
@@ -611,3 +691,12 @@ async def error_handler(update: Optional[Update], context: ContextTypes.DEFAULT_
             )
         except Exception:
             pass
+
+
+# Inline buttons that run a handler; defined last so every handler exists
+_CALLBACK_HANDLERS = {
+    "list_servers": servers_list,
+    "disconnect_server": disconnect_from_server_handler,
+    "default_commands": show_default_commands,
+    "help": help_command,
+}
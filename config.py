@@ -3,7 +3,7 @@ Configuration management module for SSH Telegram Bot.
 Handles environment variables and configuration settings.
 """
 import os
-from typing import Optional, List
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -25,10 +25,20 @@ class Config:
     # SSH Connection Settings
     SSH_TIMEOUT: int = int(os.getenv('SSH_TIMEOUT', '10'))
     SSH_CONNECTION_TIMEOUT: int = int(os.getenv('SSH_CONNECTION_TIMEOUT', '5'))
+    # Seconds without a command after which a chat's SSH session is closed
+    IDLE_TIMEOUT: int = int(os.getenv('IDLE_TIMEOUT', '1800'))
+    # Seconds between checks for idle SSH sessions
+    IDLE_CHECK_INTERVAL: int = int(os.getenv('IDLE_CHECK_INTERVAL', '60'))
+    # Worker threads for operations that touch many servers at once
+    MAX_CONCURRENCY: int = int(os.getenv('MAX_CONCURRENCY', str(min(32, (os.cpu_count() or 1) * 4))))
+    
+    # Telegram Polling Settings (long polling: Telegram holds each request open up to POLL_TIMEOUT)
+    POLL_INTERVAL: float = float(os.getenv('POLL_INTERVAL', '0'))
+    POLL_TIMEOUT: int = int(os.getenv('POLL_TIMEOUT', '30'))
     
     # Security Settings
-    ALLOWED_COMMAND_PREFIXES: List[str] = ['ls', 'cd', 'pwd', 'cat', 'grep', 'find', 'ps', 'top', 'df', 'du', 'free', 'uptime']
-    BLOCKED_COMMANDS: List[str] = ['rm -rf /', 'mkfs', 'dd if=', 'format', 'fdisk']
+    ALLOWED_COMMAND_PREFIXES: Tuple[str, ...] = ('ls', 'cd', 'pwd', 'cat', 'grep', 'find', 'ps', 'top', 'df', 'du', 'free', 'uptime')
+    BLOCKED_COMMANDS: Tuple[str, ...] = ('rm -rf /', 'mkfs', 'dd if=', 'format', 'fdisk')
     
     @classmethod
     def validate(cls) -> bool:
@@ -9,7 +9,8 @@ from bot import (
     start_command, help_command, add_admin, add_server_handler,
     del_server_handler, servers_list, connect_to_server_handler,
     disconnect_from_server_handler, command_handler, callback_handler,
-    add_command, remove_command, show_default_commands, error_handler
+    add_command, remove_command, show_default_commands, error_handler,
+    reap_idle_sessions_job
 )
 from config import Config
 from init_files import initialize_files
@@ -55,12 +56,26 @@ def main():
         # Register error handler
         app.add_error_handler(error_handler)
 
+        # Periodically close SSH sessions nobody has used for a while
+        if app.job_queue:
+            app.job_queue.run_repeating(
+                reap_idle_sessions_job,
+                interval=Config.IDLE_CHECK_INTERVAL,
+                first=Config.IDLE_CHECK_INTERVAL
+            )
+        else:
+            logger.warning("JobQueue is unavailable; idle SSH sessions will not be closed automatically")
+
         logger.info("Bot is running...")
-        app.run_polling(poll_interval=3, drop_pending_updates=True)
+        app.run_polling(
+            poll_interval=Config.POLL_INTERVAL,
+            timeout=Config.POLL_TIMEOUT,
+            drop_pending_updates=True
+        )
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.error(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         raise
 
 
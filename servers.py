@@ -2,59 +2,109 @@
 Server management module for SSH Telegram Bot.
 Handles SSH connections, server data management, and command execution.
 """
+import asyncio
 import csv
-import ipaddress
 import os
 import paramiko
 import logging
+import select
+import socket
 import threading
 import time
-from typing import Optional, List, Tuple
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional, List, Tuple
 from config import Config
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = pacsv = None
+
 logger = logging.getLogger(__name__)
 
-# Global SSH client instance
-_ssh_client: Optional[paramiko.SSHClient] = None
-_connection_lock = threading.Lock()
-_is_connected = False
-_connected_server_info: Optional[dict] = None
+# paramiko logs every connection and authentication step at INFO; only keep its warnings
+logging.getLogger("paramiko").setLevel(logging.WARNING)
+
+
+class _Session:
+    """An SSH connection and its remote shell, owned by one chat."""
+    
+    def __init__(self, client: paramiko.SSHClient, info: dict):
+        self.client = client
+        self.info = info
+        # Long-lived remote shell that commands are sent through
+        self.shell: Optional[paramiko.Channel] = None
+        # Serializes commands within the chat; other chats run in parallel
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+# Open SSH sessions keyed by Telegram chat ID
+_sessions: Dict[int, _Session] = {}
+_sessions_lock = threading.Lock()
 
+# Channel read size and the most output kept per stream (the tail is kept)
+_RECV_SIZE = 65536
+_MAX_OUTPUT_BYTES = 1 << 20
 
-def get_ssh_client() -> paramiko.SSHClient:
+_SERVERS_HEADER = ['SERVER_IP', 'LOGIN_USERNAME', 'LOGIN_PASSWORD', 'ADDED_BY', 'DATE_ADDED']
+
+# Buffer size for servers file I/O; larger buffers mean fewer read()/write() calls
+_CSV_BUFFER_SIZE = 1 << 20
+
+# Shared pool for per-server work that is bound by network round trips
+_io_pool = ThreadPoolExecutor(max_workers=Config.MAX_CONCURRENCY, thread_name_prefix='server-io')
+
+# Parsed servers file, reloaded only when its mtime or size changes
+_servers_cache: List[List[str]] = []
+_servers_mtime: int = -1
+_servers_size: int = -1
+_servers_lock = threading.RLock()
+
+
+def _new_ssh_client() -> paramiko.SSHClient:
     """
-    Get or create SSH client instance.
+    Create an SSH client instance.
     
     Returns:
         SSH client instance
     """
-    global _ssh_client
-    if _ssh_client is None:
-        _ssh_client = paramiko.SSHClient()
-        _ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    return _ssh_client
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    return client
 
 
-def is_connected_to_server() -> bool:
+def is_connected_to_server(chat_id: int) -> bool:
     """
-    Check if currently connected to a server.
+    Check if a chat is connected to a server.
+    
+    Args:
+        chat_id: Telegram chat ID
     
     Returns:
         True if connected, False otherwise
     """
-    return _is_connected
+    return chat_id in _sessions
 
 
-def get_connected_server_info() -> Optional[dict]:
+def get_connected_server_info(chat_id: int) -> Optional[dict]:
     """
-    Get information about currently connected server.
+    Get information about the server a chat is connected to.
+    
+    Args:
+        chat_id: Telegram chat ID
     
     Returns:
         Server info dict or None
     """
-    return _connected_server_info
+    session = _sessions.get(chat_id)
+    return session.info if session else None
 
 
+@lru_cache(maxsize=1024)
 def is_valid_ip(ip: str) -> bool:
     """
     Validate IP address.
@@ -65,11 +115,13 @@ def is_valid_ip(ip: str) -> bool:
     Returns:
         True if valid IP, False otherwise
     """
-    try:
-        ipaddress.ip_address(ip)
-        return True
-    except ValueError:
-        return False
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, ip)
+            return True
+        except (OSError, ValueError):  # ValueError on embedded null bytes
+            pass
+    return False
 
 
 def is_valid_login(server_ip: str, username: str, password: str, timeout: int = 5) -> bool:
@@ -99,7 +151,7 @@ def is_valid_login(server_ip: str, username: str, password: str, timeout: int =
         )
         return True
     except Exception as e:
-        logger.warning(f"Login validation failed for {server_ip}: {e}")
+        logger.warning("Login validation failed for %s: %s", server_ip, e)
         return False
     finally:
         if test_client:
@@ -109,28 +161,121 @@ def is_valid_login(server_ip: str, username: str, password: str, timeout: int =
                 pass
 
 
-def get_servers_data() -> List[List[str]]:
+def probe_servers(timeout: int = 2) -> List[bool]:
     """
-    Read server data from CSV file.
+    Check the stored login of every server, probing them in parallel.
+    
+    Args:
+        timeout: Connection timeout per server in seconds
+        
+    Returns:
+        Login validity of each server, in servers list order
+    """
+    return list(_io_pool.map(
+        lambda server: is_valid_login(server[0], server[1], server[2], timeout),
+        _load_servers()
+    ))
+
+
+def _load_servers() -> List[List[str]]:
+    """
+    Get the cached server rows, re-parsing the CSV file only if it changed.
+    
+    The returned list is shared with the cache and must not be mutated.
     
     Returns:
         List of server data rows
     """
-    servers = []
+    global _servers_cache, _servers_mtime, _servers_size
     try:
-        if not os.path.exists(Config.SERVERS_FILE):
-            logger.warning(f"Servers file not found: {Config.SERVERS_FILE}")
-            return servers
+        st = os.stat(Config.SERVERS_FILE)
+        if st.st_mtime_ns == _servers_mtime and st.st_size == _servers_size:
+            return _servers_cache
         
-        with open(Config.SERVERS_FILE, 'r', encoding='utf-8') as csv_file:
-            csv_reader = csv.reader(csv_file, delimiter=',')
-            for line_count, row in enumerate(csv_reader):
-                if line_count > 0 and len(row) >= 3:  # Skip header and validate row
-                    servers.append(row)
-            logger.info(f"Loaded {len(servers)} servers from file")
+        with _servers_lock:
+            if st.st_mtime_ns != _servers_mtime or st.st_size != _servers_size:
+                servers = _read_servers_file()
+                logger.info("Loaded %s servers from file", len(servers))
+                _servers_cache = servers
+                _servers_mtime = st.st_mtime_ns
+                _servers_size = st.st_size
+            return _servers_cache
+    except FileNotFoundError:
+        logger.warning("Servers file not found: %s", Config.SERVERS_FILE)
     except Exception as e:
-        logger.error(f"Error reading servers data: {e}")
-    return servers
+        logger.error("Error reading servers data: %s", e)
+    return []
+
+
+def _read_servers_file() -> List[List[str]]:
+    """
+    Parse the servers file, skipping the header and rows with fewer than 3 fields.
+    
+    Uses pyarrow's vectorized CSV reader when it is installed. Files it
+    would parse differently from csv.reader (ragged rows, values spanning
+    lines, an empty file) make it raise, and are re-read with csv.
+    
+    Returns:
+        List of server data rows
+    """
+    if pacsv is not None:
+        try:
+            table = pacsv.read_csv(
+                Config.SERVERS_FILE,
+                read_options=pacsv.ReadOptions(skip_rows=1, column_names=_SERVERS_HEADER),
+                convert_options=pacsv.ConvertOptions(column_types=dict.fromkeys(_SERVERS_HEADER, pa.string()))
+            )
+            return [list(row) for row in zip(*(column.to_pylist() for column in table.columns))]
+        except Exception as e:
+            logger.debug("pyarrow could not parse servers file, falling back to csv: %s", e)
+    
+    with open(Config.SERVERS_FILE, 'r', encoding='utf-8', buffering=_CSV_BUFFER_SIZE) as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter=',')
+        next(csv_reader, None)  # Skip header
+        return [row for row in csv_reader if len(row) >= 3]
+
+
+def get_servers_data() -> List[List[str]]:
+    """
+    Read server data from CSV file.
+    
+    Returns:
+        List of server data rows
+    """
+    # Callers may mutate the result, so hand out a copy
+    return list(_load_servers())
+
+
+def get_server_by_index(index: int) -> Optional[List[str]]:
+    """
+    Get a single server's data row.
+    
+    Args:
+        index: 0-based server index
+        
+    Returns:
+        Server data row, or None if there is no such server
+    """
+    servers = _load_servers()
+    if 0 <= index < len(servers):
+        return servers[index]
+    return None
+
+
+def _update_servers_cache(servers: List[List[str]]):
+    """
+    Store a freshly written servers list without re-reading the file.
+    
+    Must be called with _servers_lock held, right after writing the file.
+    
+    Args:
+        servers: Server rows that now match the file contents
+    """
+    global _servers_cache, _servers_mtime, _servers_size
+    st = os.stat(Config.SERVERS_FILE)
+    _servers_cache = servers
+    _servers_mtime = st.st_mtime_ns
+    _servers_size = st.st_size
 
 
 def add_server(server_ip: str, username: str, password: str, sender: str, timestamp: str) -> bool:
@@ -147,20 +292,36 @@ def add_server(server_ip: str, username: str, password: str, sender: str, timest
     Returns:
         True if successful, False otherwise
     """
+    global _servers_mtime
+    
     try:
-        file_exists = os.path.exists(Config.SERVERS_FILE)
-        
-        with open(Config.SERVERS_FILE, 'a', encoding='utf-8', newline='') as csv_file:
-            csv_writer = csv.writer(csv_file, delimiter=',')
-            if not file_exists:
-                # Write header if file is new
-                csv_writer.writerow(['SERVER_IP', 'LOGIN_USERNAME', 'LOGIN_PASSWORD', 'ADDED_BY', 'DATE_ADDED'])
-            csv_writer.writerow([server_ip, username, password, sender, timestamp])
+        with _servers_lock:
+            row = [server_ip, username, password, sender, timestamp]
+            try:
+                st = os.stat(Config.SERVERS_FILE)
+                cache_fresh = st.st_mtime_ns == _servers_mtime and st.st_size == _servers_size
+            except FileNotFoundError:
+                cache_fresh = False
+            
+            with open(Config.SERVERS_FILE, 'a', encoding='utf-8', newline='', buffering=_CSV_BUFFER_SIZE) as csv_file:
+                csv_writer = csv.writer(csv_file, delimiter=',')
+                # Append mode starts at the end, so position 0 means the file is empty
+                if csv_file.tell() == 0:
+                    servers = []
+                    csv_writer.writerow(_SERVERS_HEADER)
+                else:
+                    servers = _servers_cache if cache_fresh else None
+                csv_writer.writerow(row)
+            if servers is not None:
+                _update_servers_cache(servers + [row])
+            else:
+                # The cache did not match the old file; re-parse on the next read
+                _servers_mtime = -1
         
-        logger.info(f"Server {server_ip} added successfully by {sender}")
+        logger.info("Server %s added successfully by %s", server_ip, sender)
         return True
     except Exception as e:
-        logger.error(f"Error adding server: {e}")
+        logger.error("Error adding server: %s", e)
         return False
 
 
@@ -174,130 +335,391 @@ def del_server(server_number: int) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    global _servers_mtime
+    
+    tmp_path = f"{Config.SERVERS_FILE}.tmp"
+    if server_number < 1:
+        return False
+    
     try:
-        if not os.path.exists(Config.SERVERS_FILE):
-            return False
+        with _servers_lock:
+            st = os.stat(Config.SERVERS_FILE)
+            cache_fresh = st.st_mtime_ns == _servers_mtime and st.st_size == _servers_size
+            removed_server = None
+            
+            # Copy every row except the deleted one into a temp file in one pass
+            with open(Config.SERVERS_FILE, 'r', encoding='utf-8', newline='', buffering=_CSV_BUFFER_SIZE) as src_file, \
+                    open(tmp_path, 'w', encoding='utf-8', newline='', buffering=_CSV_BUFFER_SIZE) as tmp_file:
+                csv_reader = csv.reader(src_file, delimiter=',')
+                csv_writer = csv.writer(tmp_file, delimiter=',')
+                next(csv_reader, None)  # Skip header
+                csv_writer.writerow(_SERVERS_HEADER)
+                index = 0
+                for row in csv_reader:
+                    if len(row) < 3:  # Not counted by get_servers_data either
+                        continue
+                    index += 1
+                    if index == server_number:
+                        removed_server = row
+                    else:
+                        csv_writer.writerow(row)
+            
+            if removed_server is None:
+                os.remove(tmp_path)
+                return False
+            
+            os.replace(tmp_path, Config.SERVERS_FILE)
+            if cache_fresh:
+                _update_servers_cache(_servers_cache[:server_number - 1] + _servers_cache[server_number:])
+            else:
+                _servers_mtime = -1
         
-        servers = get_servers_data()
-        if server_number < 1 or server_number > len(servers):
-            return False
-        
-        # Remove the server (server_number is 1-based, so subtract 1)
-        removed_server = servers.pop(server_number - 1)
-        
-        # Write back to file
-        with open(Config.SERVERS_FILE, 'w', encoding='utf-8', newline='') as csv_file:
-            csv_writer = csv.writer(csv_file, delimiter=',')
-            csv_writer.writerow(['SERVER_IP', 'LOGIN_USERNAME', 'LOGIN_PASSWORD', 'ADDED_BY', 'DATE_ADDED'])
-            for server in servers:
-                csv_writer.writerow(server)
-        
-        logger.info(f"Server {removed_server[0]} deleted successfully")
+        logger.info("Server %s deleted successfully", removed_server[0])
         return True
+    except FileNotFoundError:
+        logger.warning("Servers file not found: %s", Config.SERVERS_FILE)
+        return False
     except Exception as e:
-        logger.error(f"Error deleting server: {e}")
+        logger.error("Error deleting server: %s", e)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
         return False
 
 
-def connect_to_server(server_ip: str, username: str, password: str) -> Tuple[bool, Optional[str]]:
+def connect_to_server(chat_id: int, server_ip: str, username: str, password: str) -> Tuple[bool, Optional[str]]:
     """
-    Connect to an SSH server.
+    Connect a chat to an SSH server.
     
     Args:
+        chat_id: Telegram chat ID
         server_ip: Server IP address
         username: SSH username
         password: SSH password
-        
+    
     Returns:
         Tuple of (success, error_message)
     """
-    global _is_connected, _connected_server_info, _ssh_client
+    if chat_id in _sessions:
+        return False, "Already connected to a server. Please disconnect first."
+    
+    # Connect outside _sessions_lock so a slow server only delays this chat
+    client = _new_ssh_client()
+    try:
+        client.connect(
+            server_ip,
+            username=username,
+            password=password,
+            timeout=Config.SSH_CONNECTION_TIMEOUT,
+            allow_agent=False,
+            look_for_keys=False
+        )
+    except paramiko.AuthenticationException:
+        error_msg = "Authentication failed. Check username and password."
+    except paramiko.SSHException as e:
+        error_msg = f"SSH connection error: {str(e)}"
+    except Exception as e:
+        error_msg = f"Connection failed: {str(e)}"
+    else:
+        error_msg = None
+    if error_msg:
+        client.close()
+        logger.error("Connection failed to %s: %s", server_ip, error_msg)
+        return False, error_msg
     
-    with _connection_lock:
-        if _is_connected:
+    session = _Session(client, {
+        'ip': server_ip,
+        'username': username,
+        'connected_at': time.time()
+    })
+    with _sessions_lock:
+        if chat_id in _sessions:
+            # Another connect for this chat finished first
+            client.close()
             return False, "Already connected to a server. Please disconnect first."
-        
-        try:
-            client = get_ssh_client()
-            client.connect(
-                server_ip,
-                username=username,
-                password=password,
-                timeout=Config.SSH_CONNECTION_TIMEOUT,
-                allow_agent=False,
-                look_for_keys=False
-            )
-            _is_connected = True
-            _connected_server_info = {
-                'ip': server_ip,
-                'username': username,
-                'connected_at': time.time()
-            }
-            logger.info(f"Successfully connected to {server_ip}")
-            return True, None
-        except paramiko.AuthenticationException:
-            error_msg = "Authentication failed. Check username and password."
-            logger.error(f"Connection failed to {server_ip}: {error_msg}")
-            return False, error_msg
-        except paramiko.SSHException as e:
-            error_msg = f"SSH connection error: {str(e)}"
-            logger.error(f"Connection failed to {server_ip}: {error_msg}")
-            return False, error_msg
-        except Exception as e:
-            error_msg = f"Connection failed: {str(e)}"
-            logger.error(f"Connection failed to {server_ip}: {error_msg}")
-            return False, error_msg
+        _sessions[chat_id] = session
+    logger.info("Chat %s connected to %s", chat_id, server_ip)
+    try:
+        _open_shell(session)
+    except Exception as e:
+        # do_command retries opening the shell on first use
+        logger.warning("Could not open shell on %s: %s", server_ip, e)
+    return True, None
 
 
-def disconnect_from_server() -> bool:
+def disconnect_from_server(chat_id: int) -> bool:
     """
-    Disconnect from the current SSH server.
+    Disconnect a chat from its SSH server.
+    
+    Args:
+        chat_id: Telegram chat ID
     
     Returns:
         True if successful, False otherwise
     """
-    global _is_connected, _connected_server_info, _ssh_client
+    with _sessions_lock:
+        session = _sessions.pop(chat_id, None)
+    if session is None:
+        return False
     
-    with _connection_lock:
-        if not _is_connected:
-            return False
-        
+    try:
+        # Let a running command finish; later ones see the session is gone
+        with session.lock:
+            _close_session(session)
+        logger.info("Chat %s disconnected from %s", chat_id, session.info['ip'])
+        return True
+    except Exception as e:
+        logger.error("Error disconnecting: %s", e)
+        return False
+
+
+def reap_idle_sessions(idle_timeout: Optional[float] = None) -> int:
+    """
+    Close sessions that have not run a command for idle_timeout seconds.
+    
+    Sessions with a command in progress are never closed.
+    
+    Args:
+        idle_timeout: Idle time in seconds, defaults to Config.IDLE_TIMEOUT
+    
+    Returns:
+        Number of sessions closed
+    """
+    if idle_timeout is None:
+        idle_timeout = Config.IDLE_TIMEOUT
+    cutoff = time.monotonic() - idle_timeout
+    idle = []
+    with _sessions_lock:
+        for chat_id, session in list(_sessions.items()):
+            # Holding session.lock keeps a command from starting until it is closed
+            if session.last_used < cutoff and session.lock.acquire(blocking=False):
+                del _sessions[chat_id]
+                idle.append((chat_id, session))
+    
+    for chat_id, session in idle:
         try:
-            if _ssh_client:
-                _ssh_client.close()
-                _ssh_client = None
-            _is_connected = False
-            _connected_server_info = None
-            logger.info("Disconnected from server")
-            return True
+            _close_session(session)
+            logger.info("Closed idle session of chat %s on %s", chat_id, session.info['ip'])
         except Exception as e:
-            logger.error(f"Error disconnecting: {e}")
-            _is_connected = False
-            _connected_server_info = None
-            return False
+            logger.error("Error closing idle session of chat %s: %s", chat_id, e)
+        finally:
+            session.lock.release()
+    return len(idle)
+
+
+def _close_session(session: _Session):
+    """Close a session's remote shell and SSH connection."""
+    _close_shell(session)
+    session.client.close()
+
+
+def _drop_session(chat_id: int, session: _Session):
+    """
+    Unregister and close a session whose SSH connection is gone.
+    
+    Must be called with session.lock held.
+    
+    Args:
+        chat_id: Telegram chat ID
+        session: Session to drop
+    """
+    with _sessions_lock:
+        if _sessions.get(chat_id) is session:
+            del _sessions[chat_id]
+    try:
+        _close_session(session)
+    except Exception:
+        pass
+    logger.info("Dropped dead session of chat %s on %s", chat_id, session.info['ip'])
+
+
+def _is_alive(session: _Session) -> bool:
+    """Check whether a session's SSH transport is still active."""
+    transport = session.client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+def _open_shell(session: _Session) -> paramiko.Channel:
+    """
+    Open the long-lived remote shell commands are sent through.
+    
+    The shell is exec'd on a session channel instead of using invoke_shell,
+    so no PTY is allocated: nothing is echoed and stdout/stderr stay separate.
+    It is the account's own login shell, as used by exec_command, so bash
+    syntax and the environment set up by its startup files keep working.
+    
+    Args:
+        session: Session with a connected SSH client
+    
+    Returns:
+        Channel running the remote shell
+    """
+    _close_shell(session)
+    session.shell = session.client.get_transport().open_session()
+    session.shell.exec_command('exec "${SHELL:-/bin/sh}"')
+    return session.shell
+
+
+def _close_shell(session: _Session):
+    """Close a session's remote shell, if one is open."""
+    shell, session.shell = session.shell, None
+    if shell is not None:
+        try:
+            shell.close()
+        except Exception:
+            pass
+
+
+def _append_capped(buffer: bytearray, data: bytes, limit: int) -> bool:
+    """
+    Append data to a buffer, dropping its oldest bytes beyond limit.
+    
+    Args:
+        buffer: Buffer to append to
+        data: Data to append
+        limit: Maximum buffer size
+        
+    Returns:
+        True if any bytes were dropped, False otherwise
+    """
+    buffer += data
+    excess = len(buffer) - limit
+    if excess > 0:
+        del buffer[:excess]
+        return True
+    return False
 
 
-def do_command(command: str, timeout: int = 30) -> Tuple[str, Optional[str]]:
+def _run_in_shell(shell: paramiko.Channel, command: str, timeout: int) -> Tuple[str, str]:
     """
-    Execute a command on the connected SSH server.
+    Run a command in the remote shell and collect its output.
+    
+    After the command, a random marker is printed on stdout and stderr;
+    output is read until both markers arrive. Only the last
+    _MAX_OUTPUT_BYTES of each stream are kept, so commands with huge
+    output cannot exhaust memory.
     
     Args:
+        shell: Channel running the remote shell
         command: Command to execute
         timeout: Command timeout in seconds
-        
+    
     Returns:
         Tuple of (stdout, stderr)
     """
-    global _ssh_client, _is_connected
+    marker = f"__END_{uuid.uuid4().hex}__"
+    # The command is passed to eval as one single-quoted word, so unbalanced
+    # quotes or here-docs in it cannot swallow the marker lines. stdin is
+    # detached so the command cannot consume the lines that follow it.
+    quoted = command.replace("'", "'\\''")
+    shell.sendall(
+        f"eval '{quoted}' </dev/null\n"
+        f"printf '%s\\n' '{marker}' >&2\n"
+        f"printf '%s\\n' '{marker}'\n".encode('utf-8')
+    )
+    
+    end_marker = f"{marker}\n".encode('utf-8')
+    limit = _MAX_OUTPUT_BYTES + len(end_marker)
+    out, err = bytearray(), bytearray()
+    out_end = err_end = -1
+    out_truncated = err_truncated = False
+    deadline = time.monotonic() + timeout
+    while out_end < 0 or err_end < 0:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Command timed out after {timeout} seconds")
+        select.select([shell], [], [], remaining)
+        
+        if out_end < 0 and shell.recv_ready():
+            data = shell.recv(_RECV_SIZE)
+            out_truncated |= _append_capped(out, data, limit)
+            out_end = out.find(end_marker, max(0, len(out) - len(data) - len(end_marker)))
+        if err_end < 0 and shell.recv_stderr_ready():
+            data = shell.recv_stderr(_RECV_SIZE)
+            err_truncated |= _append_capped(err, data, limit)
+            err_end = err.find(end_marker, max(0, len(err) - len(data) - len(end_marker)))
+        if (out_end < 0 and shell.recv_ready()) or (err_end < 0 and shell.recv_stderr_ready()):
+            continue
+        if shell.eof_received:
+            # The shell exited, e.g. on "exit" or a syntax error
+            break
+        if shell.closed:
+            # The connection dropped; select would keep returning at once
+            raise ConnectionError("SSH connection lost")
+    
+    stdout_text = bytes(out if out_end < 0 else out[:out_end]).decode('utf-8', errors='replace')
+    stderr_text = bytes(err if err_end < 0 else err[:err_end]).decode('utf-8', errors='replace')
+    if out_truncated:
+        stdout_text = f"[output truncated to last {_MAX_OUTPUT_BYTES} bytes]\n{stdout_text}"
+    if err_truncated:
+        stderr_text = f"[output truncated to last {_MAX_OUTPUT_BYTES} bytes]\n{stderr_text}"
+    return stdout_text, stderr_text
+
+
+def do_command(chat_id: int, command: str, timeout: int = 30) -> Tuple[str, Optional[str]]:
+    """
+    Execute a command on the server a chat is connected to.
+    
+    Commands run in one persistent shell per chat, so state such as the
+    working directory carries over between commands.
+    
+    Args:
+        chat_id: Telegram chat ID
+        command: Command to execute
+        timeout: Command timeout in seconds
     
-    if not _is_connected or _ssh_client is None:
+    Returns:
+        Tuple of (stdout, stderr)
+    """
+    session = _sessions.get(chat_id)
+    if session is None:
         return "", "Not connected to any server"
     
-    try:
-        stdin, stdout, stderr = _ssh_client.exec_command(command, timeout=timeout)
-        stdout_text = ''.join(stdout.readlines())
-        stderr_text = ''.join(stderr.readlines())
-        return stdout_text, stderr_text if stderr_text else None
-    except Exception as e:
-        logger.error(f"Command execution failed: {e}")
-        return "", f"Command execution failed: {str(e)}"
+    with session.lock:
+        if _sessions.get(chat_id) is not session:
+            # Disconnected or reaped while waiting for the lock
+            return "", "Not connected to any server"
+        if not _is_alive(session):
+            _drop_session(chat_id, session)
+            return "", "Connection to the server was lost. Please reconnect."
+        try:
+            shell = session.shell
+            if shell is None or shell.closed or shell.eof_received:
+                shell = _open_shell(session)
+            stdout_text, stderr_text = _run_in_shell(shell, command, timeout)
+            if shell.eof_received:
+                _close_shell(session)
+            return stdout_text, stderr_text if stderr_text else None
+        except Exception as e:
+            logger.error("Command execution failed: %s", e)
+            # The shell may still be busy with the failed command; start a fresh one next time
+            _close_shell(session)
+            if not _is_alive(session):
+                _drop_session(chat_id, session)
+            return "", f"Command execution failed: {str(e)}"
+        finally:
+            session.last_used = time.monotonic()
+
+
+# Async wrappers: these calls block on the network, so handlers run them in a
+# worker thread instead of stalling the event loop for every other user.
+
+async def is_valid_login_async(server_ip: str, username: str, password: str, timeout: int = 5) -> bool:
+    """Run is_valid_login in a worker thread."""
+    return await asyncio.to_thread(is_valid_login, server_ip, username, password, timeout)
+
+
+async def connect_to_server_async(chat_id: int, server_ip: str, username: str, password: str) -> Tuple[bool, Optional[str]]:
+    """Run connect_to_server in a worker thread."""
+    return await asyncio.to_thread(connect_to_server, chat_id, server_ip, username, password)
+
+
+async def disconnect_from_server_async(chat_id: int) -> bool:
+    """Run disconnect_from_server in a worker thread."""
+    return await asyncio.to_thread(disconnect_from_server, chat_id)
+
+
+async def do_command_async(chat_id: int, command: str, timeout: int = 30) -> Tuple[str, Optional[str]]:
+    """Run do_command in a worker thread."""
+    return await asyncio.to_thread(do_command, chat_id, command, timeout)
@@ -3,17 +3,51 @@ Utility functions for SSH Telegram Bot.
 Contains helper functions for validation, logging, and common operations.
 """
 import logging
+import os
 import re
-from typing import Optional, Tuple, List
+import time
+from functools import lru_cache
+from typing import Callable, Optional, Tuple, List, Sequence
 from telegram import Update
 
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
+# Shell chaining into "rm -rf" and redirection to/from /dev, fused into one pattern
+_DANGEROUS_RE = re.compile(r'(?:;|&&|\|)\s*rm\s+-rf|[<>]\s*/dev/', re.IGNORECASE)
+
+# Null bytes and other control characters, mapped to None for str.translate
+_CTRL_TABLE = dict.fromkeys([*range(0x20), 0x7f, *range(0x80, 0xa0)])
+
+# Line printed after each entry of the server list
+_SERVER_SEPARATOR = '-' * 20
+
+# Last formatted UTC timestamp as (epoch second, string)
+_last_timestamp: Tuple[int, str] = (-1, '')
+
+
+def utc_timestamp() -> str:
+    """
+    Get the current UTC time formatted as 'YYYY-MM-DD HH:MM:SS'.
+    
+    The string is only re-formatted once per second, since bursts of
+    messages usually arrive within the same second.
+    
+    Returns:
+        Formatted UTC timestamp
+    """
+    global _last_timestamp
+    now = int(time.time())
+    cached_second, cached_str = _last_timestamp
+    if now != cached_second:
+        cached_str = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now))
+        _last_timestamp = (now, cached_str)
+    return cached_str
+
 
 def get_user_info(update: Update) -> Tuple[Optional[int], Optional[str]]:
     """
@@ -32,49 +66,98 @@ def get_user_info(update: Update) -> Tuple[Optional[int], Optional[str]]:
     return None, None
 
 
-def validate_command(command: str, blocked_commands: List[str], allowed_prefixes: Optional[List[str]] = None) -> Tuple[bool, Optional[str]]:
+@lru_cache(maxsize=4)
+def _blocked_matcher(blocked_commands: Tuple[str, ...]) -> Callable[[str], Optional[str]]:
+    """
+    Build a matcher finding any blocked pattern in a lowercased command.
+    
+    Uses an Aho-Corasick automaton when pyahocorasick is installed and a
+    single precompiled alternation regex otherwise.
+    
+    Args:
+        blocked_commands: Tuple of blocked command patterns
+        
+    Returns:
+        Function returning the first blocked pattern found, or None
+    """
+    # Lowercased pattern -> pattern as configured, for error messages
+    patterns = {blocked.lower(): blocked for blocked in blocked_commands}
+    if not patterns:
+        return lambda command: None
+    
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for lowered, blocked in patterns.items():
+            automaton.add_word(lowered, blocked)
+        automaton.make_automaton()
+        
+        def match(command: str) -> Optional[str]:
+            for _, blocked in automaton.iter(command):
+                return blocked
+            return None
+        return match
+    
+    regex = re.compile('|'.join(map(re.escape, patterns)))
+    
+    def match(command: str) -> Optional[str]:
+        found = regex.search(command)
+        return patterns[found.group()] if found else None
+    return match
+
+
+def validate_command(command: str, blocked_commands: Sequence[str], allowed_prefixes: Optional[Sequence[str]] = None) -> Tuple[bool, Optional[str]]:
     """
     Validate SSH command for security.
     
     Args:
         command: Command string to validate
-        blocked_commands: List of blocked command patterns
-        allowed_prefixes: Optional list of allowed command prefixes
+        blocked_commands: Sequence of blocked command patterns
+        allowed_prefixes: Optional sequence of allowed command prefixes
         
     Returns:
         Tuple of (is_valid, error_message)
     """
+    # Tuples make the arguments hashable for the result cache
+    return _validate_command(
+        command,
+        tuple(blocked_commands),
+        tuple(allowed_prefixes) if allowed_prefixes else None
+    )
+
+
+@lru_cache(maxsize=4)
+def _lowercase_prefixes(prefixes: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Lowercase a prefix tuple once, so it can be matched against a lowercased word."""
+    return tuple(prefix.lower() for prefix in prefixes)
+
+
+@lru_cache(maxsize=1024)
+def _validate_command(command: str, blocked_commands: Tuple[str, ...], allowed_prefixes: Optional[Tuple[str, ...]]) -> Tuple[bool, Optional[str]]:
+    """Memoized implementation of validate_command."""
     command = command.strip()
     
-    # Check for blocked commands
-    for blocked in blocked_commands:
-        if blocked.lower() in command.lower():
-            return False, f"Command contains blocked pattern: {blocked}"
+    # Check for blocked commands in a single pass over the command
+    blocked = _blocked_matcher(blocked_commands)(command.lower())
+    if blocked is not None:
+        return False, f"Command contains blocked pattern: {blocked}"
     
     # Check for dangerous patterns
-    dangerous_patterns = [
-        r';\s*rm\s+-rf',
-        r'&&\s*rm\s+-rf',
-        r'\|\s*rm\s+-rf',
-        r'>\s*/dev/',
-        r'<\s*/dev/',
-    ]
-    
-    for pattern in dangerous_patterns:
-        if re.search(pattern, command, re.IGNORECASE):
-            return False, "Command contains dangerous pattern"
+    if _DANGEROUS_RE.search(command):
+        return False, "Command contains dangerous pattern"
     
     # If allowed_prefixes is specified, check if command starts with one
     if allowed_prefixes:
-        command_parts = command.split()
+        command_parts = command.split(None, 1)
         if command_parts:
             first_word = command_parts[0].lower()
-            if not any(first_word.startswith(prefix) for prefix in allowed_prefixes):
+            # str.startswith checks a whole tuple of prefixes in one call
+            if not first_word.startswith(_lowercase_prefixes(allowed_prefixes)):
                 return False, f"Command must start with one of: {', '.join(allowed_prefixes)}"
     
     return True, None
 
 
+@lru_cache(maxsize=1024)
 def sanitize_input(text: str) -> str:
     """
     Sanitize user input to prevent injection attacks.
@@ -85,12 +168,32 @@ def sanitize_input(text: str) -> str:
     Returns:
         Sanitized text
     """
-    # Remove null bytes and control characters
-    text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-    # Limit length
-    if len(text) > 1000:
-        text = text[:1000]
-    return text.strip()
+    # Remove null bytes and control characters, then limit length
+    return text.translate(_CTRL_TABLE)[:1000].strip()
+
+
+def write_file_atomic(path: str, content: str):
+    """
+    Replace a file's contents atomically.
+    
+    The content is written to a temporary file next to the target, which is
+    then renamed over it, so readers never see a partially written file.
+    
+    Args:
+        path: File to replace
+        content: New file contents
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
 def format_server_list(servers: List[List[str]]) -> str:
@@ -106,14 +209,14 @@ def format_server_list(servers: List[List[str]]) -> str:
     if not servers:
         return "No servers found."
     
-    table = "All Servers:\n\n"
+    parts = ["All Servers:\n\n"]
     for idx, server in enumerate(servers, start=1):
-        table += (
+        parts.append(
             f"Server Number: {idx}\n"
             f"Server IP: {server[0]}\n"
             f"Added By: {server[3]}\n"
             f"Date Added: {server[4]}\n"
-            f"{'-' * 20}\n\n"
+            f"{_SERVER_SEPARATOR}\n\n"
         )
-    return table
+    return "".join(parts)
 